@@ -1,29 +1,221 @@
 import gradio as gr
 import ollama
-import base64
+from ollama import AsyncClient
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+from collections import OrderedDict
 from PIL import Image
-from database import create_db_and_tables, save_food, get_all_foods
+from database import create_db_and_tables, save_food, get_all_foods_lite, get_today_calories, get_foods_version
+
+# Uploads are downscaled immediately, so replace PIL's hidden decompression
+# bomb branch with the explicit megapixel guard in preprocess_image
+Image.MAX_IMAGE_PIXELS = None
+
+# Optional SIMD JPEG encoder (libjpeg-turbo); stock Pillow stays the fallback
+try:
+    import numpy as np
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
 import io
+import threading
 import time
 import json
-import re
 import os
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from user_profile import create_profile_modal, get_user_daily_calories, get_user_name
 
-# Global state for calorie tracking
-daily_calories = 0
-current_date = datetime.now().date()
-daily_goal = get_user_daily_calories()  # Loads from user profile
+# Shared async client so the Gradio event loop can overlap concurrent Ollama
+# calls; one module-level instance also reuses the underlying keep-alive socket
+# instead of paying connection setup per request
+ollama_client = AsyncClient(
+    host=os.environ.get('OLLAMA_HOST', 'http://localhost:11434'),
+    timeout=120
+)
+
+# 4-bit quantized LLaVA roughly halves memory bandwidth per decoded token
+# (about 2x tokens/sec on memory-bound setups); override via env to pin
+# another tag, e.g. WTF_LLAVA_MODEL=llava
+LLAVA_MODEL = os.environ.get('WTF_LLAVA_MODEL', 'llava:7b-v1.6-mistral-q4_K_M')
+
+# Text-side model; pin a quantized tag (e.g.
+# WTF_TEXT_MODEL=llama3.2:3b-instruct-q4_K_M) to halve decode bandwidth on
+# memory-bound hosts - ollama must have the tag pulled
+TEXT_MODEL = os.environ.get('WTF_TEXT_MODEL', 'llama3.2')
+
+# Fallback meal-name extraction is trivial; point this at a 1B tag
+# (e.g. WTF_NAME_MODEL=llama3.2:1b) to keep it off the main model's lane
+NAME_MODEL = os.environ.get('WTF_NAME_MODEL', TEXT_MODEL)
+
+# Token budgets for the structured analysis call. Prefill scales with num_ctx
+# and decode with num_predict, so keep both as tight as the JSON schema allows;
+# the description field is why this sits above a bare four-number minimum.
+LLAVA_NUM_PREDICT = int(os.environ.get('WTF_NUM_PREDICT', '160'))
+LLAVA_NUM_CTX = int(os.environ.get('WTF_NUM_CTX', '768'))
+
+# Native tile size of the pinned model's vision encoder (448 for LLaVA v1.6,
+# 336 for v1.5); preprocessing targets this so the encoder skips its own resize
+LLAVA_INPUT_SIZE = 448
+
+# Bound once; saves the double attribute lookup per resize in the workers
+_BILINEAR = Image.Resampling.BILINEAR
+
+# The analysis call's sampling options never vary, so build the dict once
+# instead of allocating it per request
+LLAVA_OPTIONS = {
+    'temperature': 0.3,
+    'num_predict': LLAVA_NUM_PREDICT,
+    'num_ctx': LLAVA_NUM_CTX,
+    'top_p': 0.8,
+    'repeat_penalty': 1.1
+}
+
+# Byte-identical across calls so the server can reuse the prefix's prefill
+ANALYSIS_PROMPT = '''Analyze this food image. Respond with a JSON object with exactly these fields:
+
+{"name": "<meal name, 2-4 words>", "description": "<detailed description of the food you see>", "total_calories": 500, "total_fats_g": 25, "total_proteins_g": 30, "total_carbs_g": 45}
+
+Estimate the nutrition for the whole meal shown.'''
+
+# Follow-up prompt templates, hoisted so the hot path only fills in the
+# dynamic values. Keyed by (has nutrition data, has a typed message).
+# Each template keeps its instructions first and the per-request data last,
+# so the prefix is byte-identical across requests and the server's prompt
+# cache can skip re-prefilling it.
+_PROMPT_IMG_MSG_NUTRI = """You are a nutritionist and food expert. A user has shared a food photo along with a message. Format your response as:
+
+🍽️ **Meal Name:**
+[Provide ONLY a name for the meal using 2-6 words, no description]
+
+📊 **Nutritional Information:**
+[One bullet per value from the nutrition data below, using 🔥 calories, 🥑 fats, 🥩 proteins, 🍞 carbs]
+
+📈 **Daily Progress:**
+[One bullet each for the meal's added calories, today's total and the daily goal from the data below]
+
+Then provide relevant advice based on the user's message and nutritional analysis. Be conversational and helpful.
+
+Nutrition data: calories {calories}, fats {fats}g, proteins {proteins}g, carbs {carbs}g
+Daily progress: meal added +{meal_calories} calories, total today {total_calories} calories, daily goal {daily_goal} calories
+Previous analysis: {analysis}
+User message: "{message}"
+"""
+
+_PROMPT_IMG_MSG_NONUTRI = """You are a nutritionist and food expert. A user has shared a food photo along with a message. Format your response as:
+🍽️ **Meal Analysis Results**
+
+1. Provide ONLY a name for the meal using 2-6 words, no description.
+2. General nutritional insights about the food
+3. Relevant advice based on the user's message
+
+Be conversational and helpful.
+
+Previous analysis: {analysis}
+User message: "{message}"
+"""
+
+_PROMPT_IMG_NOMSG_NUTRI = """You are a nutritionist and food expert. A user has shared a food photo. Format your response as:
+
+🍽️ **Meal Analysis Results**
+
+Provide ONLY a name for the meal using 2-6 words, no description.
+
+📊 **Nutritional Information:**
+[One bullet per value from the nutrition data below, using 🔥 calories, 🥑 fats, 🥩 proteins, 🍞 carbs]
+
+📈 **Daily Progress:**
+[One bullet each for the meal's added calories, today's total and the daily goal from the data below]
+
+Then provide one helpful insight or tip about the meal. Be conversational and helpful.
+
+Nutrition data: calories {calories}, fats {fats}g, proteins {proteins}g, carbs {carbs}g
+Daily progress: meal added +{meal_calories} calories, total today {total_calories} calories, daily goal {daily_goal} calories
+Previous analysis: {analysis}
+"""
+
+_PROMPT_IMG_NOMSG_NONUTRI = """You are a nutritionist and food expert. A user has shared a food photo. Provide a meal analysis that includes:
+
+🍽️ **Meal Name:**
+[Provide ONLY a name for the meal using 2-6 words, no description]
+
+[Provide general nutritional insights and one helpful tip. Be conversational and helpful.]
+
+Previous analysis: {analysis}
+"""
+
+_DESCRIPTION_PROMPTS = {
+    (True, True): _PROMPT_IMG_MSG_NUTRI,
+    (True, False): _PROMPT_IMG_NOMSG_NUTRI,
+    (False, True): _PROMPT_IMG_MSG_NONUTRI,
+    (False, False): _PROMPT_IMG_NOMSG_NONUTRI,
+}
+
+_TEXT_SYSTEM_PROMPT = """You are a helpful nutritionist and food expert. You have full access to the user's complete meal tracking history and daily progress, provided with each question. Use this data to give personalized advice about nutrition, healthy eating, meal planning, diet analysis, or fitness. Always reference their actual tracked meals when relevant. Be conversational, informative, and supportive."""
+
+_TEXT_TURN_TEMPLATE = """Current daily progress:
+- Daily calories consumed: {total_calories}
+- Daily calorie goal: {daily_goal}
+- Remaining calories: {remaining}
+
+{meals_text}
+
+{message}"""
+
+# Static progress-bar markup built once; per-call work is just the scalar fills
+PROGRESS_TEMPLATE = """
+    <div style="margin: 20px 0;">
+        <h3 style="color: #333; margin-bottom: 10px;">📊 Daily Calorie Progress</h3>
+        <div style="background-color: #f0f0f0; border-radius: 10px; padding: 4px; width: 100%; box-shadow: inset 0 2px 4px rgba(0,0,0,0.1);">
+                         <div style="position: relative; height: 30px; width: 100%;">
+                 <div style="background-color: {color}; height: 100%; width: {visual_width}%; border-radius: 6px; transition: all 0.3s ease;"></div>
+                 <div style="position: absolute; top: 0; left: 0; right: 0; bottom: 0; display: flex; align-items: center; justify-content: center; color: #333; font-weight: bold;">
+                     {percentage:.1f}%
+                 </div>
+             </div>
+        </div>
+        <div style="display: flex; justify-content: space-between; margin-top: 8px; font-size: 14px; color: #666;">
+            <span>🔥 {current_calories:.0f} calories consumed</span>
+            <span>🎯 Goal: {daily_goal:.0f} calories</span>
+        </div>
+        <div style="text-align: center; margin-top: 5px; font-size: 13px; color: #888;">
+            {status_message}
+        </div>
+    </div>
+    """
 
-def reset_daily_calories_if_new_day():
-    """Reset daily calories if it's a new day"""
-    global daily_calories, current_date
-    today = datetime.now().date()
-    if today != current_date:
-        daily_calories = 0
-        current_date = today
+# Daily calorie goal shared across sessions (refreshed from the user profile)
+daily_goal = get_user_daily_calories()  # Loads from user profile
 
+def _next_midnight_epoch():
+    """Epoch seconds of the next local midnight"""
+    tomorrow = datetime.now() + timedelta(days=1)
+    return tomorrow.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+@dataclass(slots=True)
+class DailyState:
+    """Per-session calorie tally that rolls over at local midnight"""
+    calories: int = 0
+    next_reset_epoch: float = field(default_factory=_next_midnight_epoch)
+    # Naive-UTC watermark set by the manual reset button; re-derivations from
+    # the database only sum rows created after it, so a reset survives the
+    # next save instead of being overwritten by the full day's sum
+    reset_at: datetime = None
+
+    def roll_over_if_new_day(self):
+        """Zero the tally once the day boundary passes; the precomputed epoch
+        makes the per-request check a float compare instead of building and
+        comparing datetime objects"""
+        if time.time() >= self.next_reset_epoch:
+            self.calories = 0
+            self.next_reset_epoch = _next_midnight_epoch()
+            self.reset_at = None  # the watermark belonged to the old day
+
+# Pure in both arguments, so identical (calories, goal) pairs reuse the
+# rendered HTML instead of re-running ~20 format substitutions
+@functools.lru_cache(maxsize=256)
 def create_progress_bar_html(current_calories, daily_goal):
     """Create an HTML progress bar for calorie tracking"""
     if daily_goal <= 0:
@@ -49,286 +241,423 @@ def create_progress_bar_html(current_calories, daily_goal):
     else:
         status_message = f"💪 {daily_goal - current_calories:.0f} calories remaining"
     
-    progress_html = f"""
-    <div style="margin: 20px 0;">
-        <h3 style="color: #333; margin-bottom: 10px;">📊 Daily Calorie Progress</h3>
-        <div style="background-color: #f0f0f0; border-radius: 10px; padding: 4px; width: 100%; box-shadow: inset 0 2px 4px rgba(0,0,0,0.1);">
-                         <div style="position: relative; height: 30px; width: 100%;">
-                 <div style="background-color: {color}; height: 100%; width: {visual_width}%; border-radius: 6px; transition: all 0.3s ease;"></div>
-                 <div style="position: absolute; top: 0; left: 0; right: 0; bottom: 0; display: flex; align-items: center; justify-content: center; color: #333; font-weight: bold;">
-                     {percentage:.1f}%
-                 </div>
-             </div>
-        </div>
-        <div style="display: flex; justify-content: space-between; margin-top: 8px; font-size: 14px; color: #666;">
-            <span>🔥 {current_calories:.0f} calories consumed</span>
-            <span>🎯 Goal: {daily_goal:.0f} calories</span>
-        </div>
-        <div style="text-align: center; margin-top: 5px; font-size: 13px; color: #888;">
-            {status_message}
-        </div>
-    </div>
-    """
-    return progress_html
+    return PROGRESS_TEMPLATE.format(
+        color=color,
+        visual_width=visual_width,
+        percentage=percentage,
+        current_calories=current_calories,
+        daily_goal=daily_goal,
+        status_message=status_message
+    )
+
+# JPEG wire size only matters when the payload leaves this machine
+OLLAMA_IS_REMOTE = not any(
+    h in os.environ.get('OLLAMA_HOST', 'localhost')
+    for h in ('localhost', '127.0.0.1')
+)
+
+# CPU-bound image work (decode/resize/encode) runs in worker processes so it
+# neither blocks the event loop nor serializes behind the GIL under load
+preprocess_pool = concurrent.futures.ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+
+def preprocess_image(image_path):
+    """Decode, downscale and JPEG-encode an uploaded image, returning the bytes"""
+    with Image.open(image_path) as img:
+        # Image.open only parses the header, so .size is a cheap read that
+        # happens before any pixel decoding
+        width, height = img.size
+        max_size = LLAVA_INPUT_SIZE
+
+        # Short-circuit hostile or absurd uploads before paying for a decode;
+        # PIL's own decompression-bomb cap sits far higher than anything a
+        # food photo needs
+        if width * height > 64_000_000:
+            raise ValueError(f"Image too large to process: {width}x{height}")
+
+        if img.format == 'JPEG' and img.mode == 'RGB' and width <= max_size and height <= max_size:
+            # Already a small RGB JPEG - send the original bytes untouched
+            with open(image_path, 'rb') as f:
+                return f.read()
+
+        # Ask libjpeg to decode at a reduced DCT scale - skips most
+        # pixels before we ever touch them (no-op for non-JPEG)
+        img.draft('RGB', (max_size, max_size))
+
+        # Convert to RGB if necessary (for JPEG compatibility)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Downscale in place, preserving aspect ratio
+        img.thumbnail((max_size, max_size), _BILINEAR)
+
+        # Letterbox onto the encoder's exact square input with the
+        # conventional gray fill, so CLIP doesn't resize or pad internally
+        if img.size != (max_size, max_size):
+            canvas = Image.new('RGB', (max_size, max_size), (114, 114, 114))
+            canvas.paste(img, ((max_size - img.width) // 2, (max_size - img.height) // 2))
+            img = canvas
+
+        # simplejpeg encodes through libjpeg-turbo's SIMD DCT, roughly halving
+        # encode CPU versus PIL's generic writer
+        if simplejpeg is not None:
+            return simplejpeg.encode_jpeg(np.ascontiguousarray(img), quality=80,
+                                          colorspace='RGB', fastdct=True)
+
+        # Convert to bytes with compression. The optimize Huffman pass only
+        # earns its cost for big camera shots headed to a remote server.
+        use_optimize = OLLAMA_IS_REMOTE and width * height > 2_000_000
+        img_byte_arr = io.BytesIO()
+        img.save(img_byte_arr, format='JPEG', quality=80, subsampling=2, optimize=use_optimize)
+
+    # Materialize the bytes only after the context has released the decoded
+    # pixel buffer (~600KB for 448x448 RGB), keeping peak memory per request
+    # to just the small encoded JPEG
+    return img_byte_arr.getvalue()
+
+# LRU cache of preprocessed JPEG bytes keyed on (path, mtime, size), so
+# re-submitting the same file skips the decode/resize/encode pipeline
+PREPROCESS_CACHE_SIZE = 64
+preprocess_cache = OrderedDict()
+
+async def preprocess_image_cached(image_path):
+    """Preprocess an upload, reusing cached bytes when the file is unchanged"""
+    try:
+        stat = os.stat(image_path)
+        cache_key = (image_path, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        cache_key = None
+
+    if cache_key is not None and cache_key in preprocess_cache:
+        preprocess_cache.move_to_end(cache_key)
+        return preprocess_cache[cache_key]
+
+    loop = asyncio.get_running_loop()
+    image_bytes = await loop.run_in_executor(preprocess_pool, preprocess_image, image_path)
+
+    if cache_key is not None:
+        preprocess_cache[cache_key] = image_bytes
+        if len(preprocess_cache) > PREPROCESS_CACHE_SIZE:
+            preprocess_cache.popitem(last=False)
+    return image_bytes
+
+# LRU cache of LLaVA analyses keyed by image-content hash, so re-submitting
+# the same photo skips the multi-second model call entirely
+ANALYSIS_CACHE_SIZE = 256
+analysis_cache = OrderedDict()
+
+def get_cached_analysis(cache_key):
+    """Return a cached LLaVA analysis for these image bytes, or None"""
+    analysis = analysis_cache.get(cache_key)
+    if analysis is not None:
+        analysis_cache.move_to_end(cache_key)
+    return analysis
+
+def cache_analysis(cache_key, analysis):
+    """Store a LLaVA analysis in the LRU cache, evicting the oldest entry"""
+    analysis_cache[cache_key] = analysis
+    analysis_cache.move_to_end(cache_key)
+    if len(analysis_cache) > ANALYSIS_CACHE_SIZE:
+        analysis_cache.popitem(last=False)
+
+def _fit_num_ctx(prompt_chars, num_predict):
+    """Smallest power-of-two context covering a prompt plus its reply budget.
+    KV-cache memory scales with num_ctx, so over-reserving 2048 tokens for a
+    200-token prompt wastes VRAM that could serve concurrent requests."""
+    needed = prompt_chars // 3 + num_predict + 64
+    num_ctx = 256
+    while num_ctx < needed:
+        num_ctx *= 2
+    return min(num_ctx, 4096)
+
+# Cached prompt view of the food table; 'version' tracks the table's write
+# counter so the text is rebuilt only after a meal is saved
+_meals_text_cache = {'version': -1, 'text': '', 'foods': []}
+
+def _history_to_messages(history):
+    """Flatten gradio's [(user, assistant), ...] pairs into chat messages"""
+    messages = []
+    for user_turn, assistant_turn in history:
+        if user_turn:
+            messages.append({'role': 'user', 'content': user_turn})
+        if assistant_turn:
+            messages.append({'role': 'assistant', 'content': assistant_turn})
+    return messages
+
+async def extract_meal_name(initial_analysis):
+    """Ask the text model for a short meal name, with a timestamp fallback"""
+    try:
+        name_response = await ollama_client.generate(
+            model=NAME_MODEL,
+            prompt=f'''Based on this food analysis, extract ONLY the meal name (2-4 words max). Return just the name, nothing else.
+
+Analysis: {initial_analysis}
+
+Examples of good names: "Grilled Chicken Salad", "Pepperoni Pizza", "Beef Burger", "Caesar Salad"''',
+            keep_alive='1h',
+            options={
+                'temperature': 0.1,
+                'num_predict': 10,
+                'num_ctx': _fit_num_ctx(len(initial_analysis) + 300, 10),
+                'top_p': 0.6,
+                'repeat_penalty': 1.1
+            }
+        )
+        meal_name = name_response.get('response', '').strip()
+        # Clean up the name
+        meal_name = meal_name.replace('"', '').replace("'", "").strip()
+        if not meal_name or len(meal_name) > 50:
+            meal_name = f"Meal_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        return meal_name
+    except Exception as name_error:
+        print(f"⚠️ Error extracting meal name: {name_error}")
+        return f"Meal_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+# Knobs that live on the Ollama *server* process, which is already running by
+# the time this app starts - they only take effect in its environment, not
+# ours. Surfaced as a startup hint (and in the README) rather than exported.
+_OLLAMA_SERVER_RECOMMENDATIONS = (
+    ("OLLAMA_NUM_PARALLEL", "4"),        # continuous batching across users
+    ("OLLAMA_MAX_LOADED_MODELS", "2"),   # llava + llama3.2 both stay resident
+    ("OLLAMA_KV_CACHE_TYPE", "q8_0"),    # halves per-token KV cache traffic
+    ("OLLAMA_FLASH_ATTENTION", "1"),     # required for the quantized KV cache
+)
 
 def warm_up_model():
-    """Pre-warm the LLaVA model to reduce first-time latency"""
+    """Pre-warm both models to reduce first-time latency"""
     try:
-        ollama.generate(model='llava', prompt='Hello', images=[])
+        # A tiny real image forces the vision encoder to load too; a text-only
+        # call leaves the CLIP weights cold and the first upload still pays
+        # the multi-second vision cold-start
+        buf = io.BytesIO()
+        Image.new('RGB', (32, 32), 128).save(buf, format='JPEG')
+        # keep_alive keeps the weights resident so follow-up calls skip the
+        # reload; the same window is passed on every real call to renew it.
+        # Warm both models concurrently so startup blocks for
+        # max(llava, llama3.2) instead of their sum. Using the real prompt
+        # prefixes (not 'Hello') primes the server's prompt cache, so the
+        # first user request skips prefill on the shared instruction block.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as warm_pool:
+            warm_pool.submit(ollama.generate, model=LLAVA_MODEL, prompt=ANALYSIS_PROMPT,
+                             images=[buf.getvalue()], keep_alive='1h',
+                             options={'num_predict': 1})
+            warm_pool.submit(ollama.chat, model=TEXT_MODEL,
+                             messages=[{'role': 'system', 'content': _TEXT_SYSTEM_PROMPT},
+                                       {'role': 'user', 'content': 'Hello'}],
+                             keep_alive='1h', options={'num_predict': 1})
+        loaded = ollama.ps()
+        if not loaded.get('models'):
+            print("⚠️ Warm-up finished but no model is loaded on the Ollama server")
+        settings = " ".join(f"{k}={v}" for k, v in _OLLAMA_SERVER_RECOMMENDATIONS)
+        print(f"💡 For best throughput, run the Ollama server with: {settings}")
     except Exception as e:
         pass
 
-def chat_with_ollama(message: str, history, image_path=None):
+# Shown while the vision call streams; the error paths compare against it to
+# replace the bubble instead of stranding it above a separate error message
+_ANALYZING_PLACEHOLDER = "🔍 Analyzing your food photo..."
+
+def _as_number(value, default=0):
+    """Best-effort numeric coercion for model-reported nutrition fields
+
+    format='json' constrains the output to valid JSON, not to numeric types -
+    the model can emit "total_calories": "500" - so coerce before arithmetic
+    instead of letting a string poison the daily tally."""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+async def chat_with_ollama(message: str, history, daily_state, image_path=None):
     """Chat function that handles both text and images with calorie tracking and streaming"""
-    global daily_calories, daily_goal
-    
     # Reset calories if it's a new day
-    reset_daily_calories_if_new_day()
+    daily_state.roll_over_if_new_day()
     
     try:
-        if image_path and os.path.exists(image_path):
+        # No exists() probe out here: text-only turns shouldn't pay a stat(),
+        # and a vanished upload surfaces through the preprocessing try/except
+        if image_path is not None:
             # Process the image for nutrition analysis
             try:
                 start_time = time.time()
+
+                # Resize/encode in a worker process, keeping the event loop free
+                image_bytes = await preprocess_image_cached(image_path)
                 
-                # Open and potentially resize the image
-                with Image.open(image_path) as img:
-                    # Convert to RGB if necessary (for JPEG compatibility)
-                    if img.mode != 'RGB':
-                        img = img.convert('RGB')
-                        
-                    # Check if image is larger than 448x448
-                    width, height = img.size
-                    max_size = 448
-                    
-                    if width > max_size or height > max_size:
-                        # Calculate new size maintaining aspect ratio
-                        if width > height:
-                            new_width = max_size
-                            new_height = int((height * max_size) / width)
-                        else:
-                            new_height = max_size
-                            new_width = int((width * max_size) / height)
-                        
-                        # Resize the image with faster method
-                        img = img.resize((new_width, new_height), Image.Resampling.BILINEAR)
-                    
-                    # Convert to bytes with compression
-                    img_byte_arr = io.BytesIO()
-                    img.save(img_byte_arr, format='JPEG', quality=85, optimize=True)
-                    image_bytes = img_byte_arr.getvalue()
-                    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                
-                # Get comprehensive analysis from image (single call)
-                try:
-                    initial_response = ollama.generate(
-                        model='llava',
-                        prompt='''Analyze this food image and provide a comprehensive analysis. Your response should include:
+                # Reuse a cached analysis when these exact bytes were seen before
+                cache_key = hashlib.blake2b(image_bytes, digest_size=16).digest()
+                initial_analysis = get_cached_analysis(cache_key)
 
-1. A short, descriptive name for the meal (2-4 words max, examples: "Grilled Chicken Salad", "Pepperoni Pizza")
-2. A detailed description of what you see in the image
-3. Nutritional information in JSON format: {"total_calories": 500, "total_fats_g": 25, "total_proteins_g": 30, "total_carbs_g": 45}
-4. Key nutritional highlights and insights
+                # Format the user message to show they shared an image
+                if message.strip():
+                    user_message = f"{message} [🖼️]"
+                else:
+                    user_message = "[🖼️ Food image]"
 
-Structure your response clearly with these sections. Be thorough but concise.''',
-                        images=[image_base64],
-                        options={
-                            'temperature': 0.3,
-                            'num_predict': 300,   # Longer for comprehensive analysis
-                            'num_ctx': 1024,
-                            'top_p': 0.8,
-                            'repeat_penalty': 1.1
-                        }
-                    )
+                # Show the shared image in the chat right away so perceived
+                # latency is the model's TTFT, not its full analysis time
+                history.append((user_message, _ANALYZING_PLACEHOLDER))
+                yield "", history
+
+                # Get comprehensive analysis from image (single streamed call)
+                try:
+                    if initial_analysis is None:
+                        stream = await ollama_client.generate(
+                            model=LLAVA_MODEL,
+                            prompt=ANALYSIS_PROMPT,
+                            images=[image_bytes],
+                            format='json',
+                            stream=True,
+                            keep_alive='1h',
+                            options=LLAVA_OPTIONS
+                        )
+                        # The raw chunks are JSON fragments, so keep the visible
+                        # placeholder and just prove liveness while accumulating
+                        analysis_parts = []
+                        last_flush = time.monotonic()
+                        async for chunk in stream:
+                            if chunk.get('response'):
+                                analysis_parts.append(chunk['response'])
+                                # Liveness ping at most ~15 Hz; every yield costs
+                                # a websocket round-trip to the browser
+                                now = time.monotonic()
+                                if now - last_flush > 0.066:
+                                    last_flush = now
+                                    history[-1] = (user_message, _ANALYZING_PLACEHOLDER)
+                                    yield "", history
+                        initial_analysis = "".join(analysis_parts)
+                        if not initial_analysis:
+                            initial_analysis = 'No response received from model'
+                        cache_analysis(cache_key, initial_analysis)
                 except Exception as ollama_error:
                     ai_response = f"Processing failed: {ollama_error}"
                     user_message = f"{message} [🖼️ Error]" if message.strip() else "[🖼️ Error]"
-                    history.append((user_message, ai_response))
+                    history[-1] = (user_message, ai_response)
                     yield "", history
                     return
                 
-                initial_analysis = initial_response.get('response', 'No response received from model')
-                
-                # Extract meal name from the initial analysis
-                try:
-                    name_response = ollama.generate(
-                        model='llama3.2',
-                        prompt=f'''Based on this food analysis, extract ONLY the meal name (2-4 words max). Return just the name, nothing else.
-
-Analysis: {initial_analysis}
-
-Examples of good names: "Grilled Chicken Salad", "Pepperoni Pizza", "Beef Burger", "Caesar Salad"''',
-                        options={
-                            'temperature': 0.1,
-                            'num_predict': 10,
-                            'num_ctx': 512,
-                            'top_p': 0.6,
-                            'repeat_penalty': 1.1
-                        }
-                    )
-                    meal_name = name_response.get('response', '').strip()
-                    # Clean up the name
-                    meal_name = meal_name.replace('"', '').replace("'", "").strip()
-                    if not meal_name or len(meal_name) > 50:
-                        meal_name = f"Meal_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                except Exception as name_error:
-                    print(f"⚠️ Error extracting meal name: {name_error}")
-                    meal_name = f"Meal_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                
-                # Extract JSON from the initial analysis
-                json_response_text = initial_analysis
-                
-                # Process and validate JSON response
+                # Parse the structured response; format='json' constrains decoding
+                # to valid JSON, so no regex extraction or retry path is needed
                 nutrition_data = None
                 meal_calories = 0
 
-                if json_response_text and len(json_response_text.strip()) > 0:
+                if initial_analysis and initial_analysis.strip():
                     try:
-                        # Extract JSON from response (in case there's extra text)
-                        json_match = re.search(r'\{.*\}', json_response_text, re.DOTALL)
-                        if json_match:
-                            json_str = json_match.group()
-                            # Validate it's proper JSON
-                            nutrition_data = json.loads(json_str)
-
-                            try:
-                                saved_food = save_food(
-                                    name=meal_name,
-                                    calories=nutrition_data.get('total_calories', 0),
-                                    fats=nutrition_data.get('total_fats_g', 0),
-                                    proteins=nutrition_data.get('total_proteins_g', 0),
-                                    carbs=nutrition_data.get('total_carbs_g', 0)
-                                )
-                                print(f"✅ Saved '{meal_name}' to database")
-                            except Exception as db_error:
-                                print(f"❌ Database error: {db_error}")
-                            
-                            # Extract calories and update daily total
-                            meal_calories = nutrition_data.get('total_calories', 0)
-                            daily_calories += meal_calories
-                            
-                            # Log JSON data to terminal
-                            print(f"\n🍽️ Nutrition Data (JSON): {json.dumps(nutrition_data, indent=2)}")
-
+                        nutrition_data = json.loads(initial_analysis)
                     except json.JSONDecodeError:
-                        print(f"\n⚠️ Failed to extract JSON from response: {json_response_text}")
-
-                # Format the user message to show they shared an image
-                if message.strip():
-                    user_message = f"{message} [🖼️]"
-                else:
-                    user_message = "[🖼️ Food image]"
-
-                # Add user message immediately
-                history.append((user_message, ""))
-
-                # Now generate the final streaming response using the text analysis
-                if message.strip():
-                    if nutrition_data:
-                        description_prompt = f"""I've shared an image of food with you along with this message: "{message}"
-
-Previous analysis: {initial_analysis}
-
-Format your response as:
-
-🍽️ **Meal Name:**
-[Provide ONLY a name for the meal using 2-6 words, no description]
-
-📊 **Nutritional Information:**
-• 🔥 Calories: {nutrition_data.get('total_calories', 'N/A')}
-• 🥑 Fats: {nutrition_data.get('total_fats_g', 'N/A')}g  
-• 🥩 Proteins: {nutrition_data.get('total_proteins_g', 'N/A')}g
-• 🍞 Carbs: {nutrition_data.get('total_carbs_g', 'N/A')}g
-
-📈 **Daily Progress:**
-• Meal added: +{meal_calories} calories
-• Total today: {daily_calories} calories  
-• Daily goal: {daily_goal} calories
-
-Then provide relevant advice based on the user's message and nutritional analysis. Be conversational and helpful."""
-                    else:
-                        description_prompt = f"""Based on this food analysis and the user's message "{message}", create a helpful response:
-
-Previous analysis: {initial_analysis}
-
-Format your response as:
-🍽️ **Meal Analysis Results**
-
-1. Provide ONLY a name for the meal using 2-6 words, no description.
-2. General nutritional insights about the food
-3. Relevant advice based on the user's message
-
-Be conversational and helpful."""
-                else:
-                    if nutrition_data:
-                        description_prompt = f"""Based on this food analysis, create a complete meal analysis response:
-
-Previous analysis: {initial_analysis}
-
-Format your response as:
-
-🍽️ **Meal Analysis Results**
-
-Provide ONLY a name for the meal using 2-6 words, no description.
+                        print(f"\n⚠️ Failed to parse JSON response: {initial_analysis}")
 
-📊 **Nutritional Information:**
-• 🔥 Calories: {nutrition_data.get('total_calories', 'N/A')}
-• 🥑 Fats: {nutrition_data.get('total_fats_g', 'N/A')}g
-• 🥩 Proteins: {nutrition_data.get('total_proteins_g', 'N/A')}g  
-• 🍞 Carbs: {nutrition_data.get('total_carbs_g', 'N/A')}g
+                # Use the model's own description in the follow-up text prompts
+                if nutrition_data and nutrition_data.get('description'):
+                    initial_analysis = nutrition_data['description']
 
-📈 **Daily Progress:**
-• Meal added: +{meal_calories} calories
-• Total today: {daily_calories} calories
-• Daily goal: {daily_goal} calories
+                # The vision call's schema already asks for the meal name, so
+                # the separate extraction call is only a fallback; when needed
+                # it still runs concurrently with the streamed response below
+                meal_name = str((nutrition_data or {}).get('name', '')).replace('"', '').replace("'", "").strip()
+                name_task = None
+                if not meal_name or len(meal_name) > 50:
+                    name_task = asyncio.create_task(extract_meal_name(initial_analysis))
 
-Then provide one helpful insight or tip about the meal. Be conversational and helpful."""
-                    else:
-                        description_prompt = f"""I've shared an image of food with you. Please provide a meal analysis that includes:
+                if nutrition_data:
+                    # Extract calories and update daily total
+                    meal_calories = _as_number(nutrition_data.get('total_calories'))
+                    daily_state.calories += meal_calories
 
-Previous analysis: {initial_analysis}
+                    # Log JSON data to terminal
+                    print(f"\n🍽️ Nutrition Data (JSON): {json.dumps(nutrition_data, indent=2)}")
 
-🍽️ **Meal Name:**
-[Provide ONLY a name for the meal using 2-6 words, no description]
+                # Now generate the final streaming response using the text analysis
+                template = _DESCRIPTION_PROMPTS[(bool(nutrition_data), bool(message.strip()))]
+                description_prompt = template.format(
+                    message=message,
+                    analysis=initial_analysis,
+                    calories=nutrition_data.get('total_calories', 'N/A') if nutrition_data else 'N/A',
+                    fats=nutrition_data.get('total_fats_g', 'N/A') if nutrition_data else 'N/A',
+                    proteins=nutrition_data.get('total_proteins_g', 'N/A') if nutrition_data else 'N/A',
+                    carbs=nutrition_data.get('total_carbs_g', 'N/A') if nutrition_data else 'N/A',
+                    meal_calories=meal_calories,
+                    total_calories=daily_state.calories,
+                    daily_goal=daily_goal
+                )
 
-[Provide general nutritional insights and one helpful tip. Be conversational and helpful.]"""
-                
-                # Add user message immediately
+                # Clear the analyzing placeholder; the first stream flush will
+                # serialize history anyway, so no extra yield is needed here
                 history[-1] = (user_message, "")
-                yield "", history
 
                 # Stream the full response using text model (no image needed)
                 ai_response = ""
                 try:
-                    stream = ollama.generate(
-                        model='llama3.2',
+                    stream = await ollama_client.generate(
+                        model=TEXT_MODEL,
                         prompt=description_prompt,
                         stream=True,
+                        keep_alive='1h',
                         options={
                             'temperature': 0.7,
                             'num_predict': 300,  # Increased for full response
-                            'num_ctx': 2048,     # Increased for longer context
+                            'num_ctx': _fit_num_ctx(len(description_prompt), 300),
                             'top_p': 0.9,
                             'repeat_penalty': 1.1
                         }
                     )
 
-                    for chunk in stream:
+                    # Buffer chunks in a list and join at flush boundaries;
+                    # += per token copies the whole string every iteration
+                    parts = []
+                    last_flush = time.monotonic()
+                    async for chunk in stream:
                         if chunk.get('response'):
-                            ai_response += chunk['response']
-                            # Update the last message in history with streaming response
-                            history[-1] = (user_message, ai_response)
-                            yield "", history
+                            parts.append(chunk['response'])
+                            # Update the last message in history with the accumulated
+                            # response, coalescing flushes to ~15 Hz so gradio isn't
+                            # pushing the whole string to the browser per token
+                            now = time.monotonic()
+                            if now - last_flush > 0.066:
+                                last_flush = now
+                                history[-1] = (user_message, "".join(parts))
+                                yield "", history
+
+                    # Always flush the completed response
+                    ai_response = "".join(parts)
+                    history[-1] = (user_message, ai_response)
+                    yield "", history
 
                 except Exception as e:
                     ai_response = f"Sorry, I had trouble analyzing the image: {str(e)}"
                     history[-1] = (user_message, ai_response)
                     yield "", history
-                    
+
+                # The fallback name call has been running alongside the stream
+                if name_task is not None:
+                    meal_name = await name_task
+
+                if nutrition_data:
+                    try:
+                        saved_food = save_food(
+                            name=meal_name,
+                            calories=meal_calories,
+                            fats=_as_number(nutrition_data.get('total_fats_g')),
+                            proteins=_as_number(nutrition_data.get('total_proteins_g')),
+                            carbs=_as_number(nutrition_data.get('total_carbs_g'))
+                        )
+                        print(f"✅ Saved '{meal_name}' to database")
+                        # Re-derive the tally from the durable store so it
+                        # stays correct across restarts and multiple workers;
+                        # the watermark keeps a manual reset in effect
+                        daily_state.calories = get_today_calories(since=daily_state.reset_at)
+                    except Exception as db_error:
+                        print(f"❌ Database error: {db_error}")
+
             except Exception as e:
                 ai_response = f"Sorry, I had trouble processing that image: {str(e)}"
                 user_message = f"{message} [🖼️ Error]" if message.strip() else "[🖼️ Error]"
-                history.append((user_message, ai_response))
+                # Failures after the placeholder was appended land here; take
+                # the bubble over rather than leaving it stranded above the
+                # error as a second assistant message
+                if history and history[-1][1] == _ANALYZING_PLACEHOLDER:
+                    history[-1] = (user_message, ai_response)
+                else:
+                    history.append((user_message, ai_response))
                 yield "", history
         
         else:
@@ -337,46 +666,59 @@ Previous analysis: {initial_analysis}
                 yield "", history
                 return
             
-            # Query database for user's food history to provide informed responses
+            # Query database for user's food history to provide informed
+            # responses; the formatted view is cached and only rebuilt after a
+            # save bumps the table's write version, so ordinary chat turns
+            # skip both the SQL query and the string assembly
             try:
-                # Get all foods from database
-                all_foods = get_all_foods()
-                
-                # Format all foods for context
-                meals_text = ""
-                if all_foods:
-                    meals_text = "Complete meal tracking history (all meals user has logged):\n"
-                    for food in all_foods:
-                        meals_text += f"- {food.name}: {food.calories} calories, {food.proteins}g protein, {food.carbs}g carbs, {food.fats}g fat\n"
+                version = get_foods_version()
+                if _meals_text_cache['version'] != version:
+                    all_foods = get_all_foods_lite()
+
+                    # Format all foods for context; a single join stays linear
+                    # in total characters where += reallocates per row
+                    if all_foods:
+                        meals_text = "Complete meal tracking history (all meals user has logged):\n" + "\n".join(
+                            f"- {food.name}: {food.calories} calories, {food.proteins}g protein, {food.carbs}g carbs, {food.fats}g fat"
+                            for food in all_foods
+                        ) + "\n"
+                    else:
+                        meals_text = "Complete meal tracking history: The user has not logged any meals yet (database is empty)."
+
+                    _meals_text_cache['version'] = version
+                    _meals_text_cache['text'] = meals_text
+                    _meals_text_cache['foods'] = all_foods
                 else:
-                    meals_text = "Complete meal tracking history: The user has not logged any meals yet (database is empty)."
-                
+                    all_foods = _meals_text_cache['foods']
+                    meals_text = _meals_text_cache['text']
+
             except Exception as db_error:
                 print(f"⚠️ Database query error: {db_error}")
+                all_foods = []
                 meals_text = "Unable to retrieve meal history."
             
-            # Create informed conversational prompt using database data
-            prompt = f"""You are a helpful nutritionist and food expert. I am providing you with the user's complete food tracking data below. The user asked: "{message}"
-
-IMPORTANT: You have full access to their meal history and daily progress. Use this data to provide personalized advice.
-
-Current daily progress:
-- Daily calories consumed: {daily_calories}
-- Daily calorie goal: {daily_goal}
-- Remaining calories: {daily_goal - daily_calories}
-
-{meals_text}
-
-Based on the meal history and daily progress data provided above, give personalized advice about nutrition, healthy eating, meal planning, diet analysis, or fitness. Always reference their actual tracked meals when relevant. Be conversational, informative, and supportive."""
+            # Build a chat transcript instead of a one-shot prompt: the fixed
+            # system message plus prior turns form a stable, growing prefix the
+            # server's KV cache can reuse, so each turn only prefills its own
+            # tokens rather than the whole conversation
+            messages = [{'role': 'system', 'content': _TEXT_SYSTEM_PROMPT}]
+            messages.extend(_history_to_messages(history))
+            messages.append({'role': 'user', 'content': _TEXT_TURN_TEMPLATE.format(
+                message=message,
+                total_calories=daily_state.calories,
+                daily_goal=daily_goal,
+                remaining=daily_goal - daily_state.calories,
+                meals_text=meals_text
+            )})
 
             # Debug: Print what data is being sent to the model
             print(f"\n🔍 Debug - Meals found in database: {len(all_foods) if all_foods else 0}")
-            print(f"🔍 Debug - Daily calories: {daily_calories}")
+            print(f"🔍 Debug - Daily calories: {daily_state.calories}")
             if all_foods:
                 print(f"🔍 Debug - Sample meals: {[food.name for food in all_foods[:3]]}")
             else:
                 print("🔍 Debug - No meals in database!")
-            print(f"🔍 Debug - Prompt length: {len(prompt)} characters")
+            print(f"🔍 Debug - Chat turns sent: {len(messages)}")
 
             # Add user message immediately
             history.append((message, ""))
@@ -385,26 +727,37 @@ Based on the meal history and daily progress data provided above, give personali
             # Stream the text response
             ai_response = ""
             try:
-                stream = ollama.generate(
-                    model='llama3.2',
-                    prompt=prompt,
+                stream = await ollama_client.chat(
+                    model=TEXT_MODEL,
+                    messages=messages,
                     stream=True,
+                    keep_alive='1h',
                     options={
                         'temperature': 0.8,
                         'num_predict': 250,  # Slightly longer for more detailed responses
-                        'num_ctx': 2048,     # Increased for longer context with database data
+                        'num_ctx': _fit_num_ctx(sum(len(m['content']) for m in messages), 250),
                         'top_p': 0.9,
                         'repeat_penalty': 1.1
                     }
                 )
-                
-                for chunk in stream:
-                    if chunk.get('response'):
-                        ai_response += chunk['response']
-                        # Update the last message in history with streaming response
-                        history[-1] = (message, ai_response)
-                        yield "", history
-                        
+
+                # Same list-buffer + coalesced-flush pattern as the image branch
+                parts = []
+                last_flush = time.monotonic()
+                async for chunk in stream:
+                    if chunk.get('message', {}).get('content'):
+                        parts.append(chunk['message']['content'])
+                        now = time.monotonic()
+                        if now - last_flush > 0.066:
+                            last_flush = now
+                            history[-1] = (message, "".join(parts))
+                            yield "", history
+
+                # Always flush the completed response
+                ai_response = "".join(parts)
+                history[-1] = (message, ai_response)
+                yield "", history
+
             except Exception as e:
                 ai_response = f"Sorry, I had trouble responding to that: {str(e)}"
                 history[-1] = (message, ai_response)
@@ -417,10 +770,12 @@ Based on the meal history and daily progress data provided above, give personali
         yield "", history
 
 # Function to reset daily calories manually
-def reset_calories():
-    global daily_calories
-    daily_calories = 0
-    return create_progress_bar_html(daily_calories, daily_goal)
+def reset_calories(daily_state):
+    daily_state.calories = 0
+    # Stamp the watermark so post-save re-derivations don't bring back the
+    # meals logged before the reset
+    daily_state.reset_at = datetime.utcnow()
+    return create_progress_bar_html(0, daily_goal), daily_state
 
 # Create the chat interface with calorie tracking
 def create_interface():
@@ -569,9 +924,15 @@ def create_interface():
                         elem_classes=["header"]
                     )
             
+            # Per-session calorie tally so concurrent users don't share a
+            # counter; the real seed happens in the demo.load callback below,
+            # since this default is evaluated once at interface build and
+            # would hand late-joining sessions the server-start snapshot
+            daily_state = gr.State(DailyState())
+
             # Daily progress bar at the top
             progress_output = gr.HTML(
-                value=create_progress_bar_html(daily_calories, daily_goal),
+                value=create_progress_bar_html(0, daily_goal),
                 elem_classes=["progress-bar"]
             )
             
@@ -667,11 +1028,11 @@ def create_interface():
         def hide_modal():
             return gr.update(visible=False)
 
-        def refresh_goal_from_profile():
+        def refresh_goal_from_profile(daily_state):
             # Update global daily_goal and refresh progress bar
             global daily_goal
             daily_goal = get_user_daily_calories()
-            updated_progress = create_progress_bar_html(daily_calories, daily_goal)
+            updated_progress = create_progress_bar_html(daily_state.calories, daily_goal)
             return gr.update(visible=False), updated_progress
 
         # Connect event handlers (add these at the end of create_interface())
@@ -687,54 +1048,81 @@ def create_interface():
 
         reset_btn.click(
             fn=refresh_goal_from_profile,
+            inputs=[daily_state],
             outputs=[modal_overlay, progress_output]
         )
 
         # Handle multimodal submission with streaming
-        def handle_multimodal_submit(multimodal_data, history):
+        async def handle_multimodal_submit(multimodal_data, history, daily_state):
             if multimodal_data is None:
-                yield None, history, create_progress_bar_html(daily_calories, daily_goal)
+                yield None, history, create_progress_bar_html(daily_state.calories, daily_goal), daily_state
                 return
-            
+
             # Extract text and files from multimodal input
             message = multimodal_data.get("text", "") if multimodal_data else ""
             files = multimodal_data.get("files", []) if multimodal_data else []
-            
-            # Use the first image file if any
-            image_path = files[0] if files else None
-            
-            # Process with streaming chat function
-            for result in chat_with_ollama(message, history, image_path):
-                # Update progress bar after potential calorie addition
-                updated_progress = create_progress_bar_html(daily_calories, daily_goal)
-                yield None, result[1], updated_progress
-        
+
+            # Analyze every attached image (text-only submissions pass one None)
+            image_paths = files if files else [None]
+
+            # Rebuild the progress bar only when calories actually change;
+            # streaming otherwise re-yields the same HTML string per token
+            last_calories = None
+            updated_progress = gr.update()
+
+            for image_path in image_paths:
+                # Process with streaming chat function
+                async for result in chat_with_ollama(message, history, daily_state, image_path):
+                    if daily_state.calories != last_calories:
+                        last_calories = daily_state.calories
+                        updated_progress = create_progress_bar_html(last_calories, daily_goal)
+                    yield None, result[1], updated_progress, daily_state
+                    # No-op update on later chunks until the total moves again
+                    updated_progress = gr.update()
+                # Only attach the typed message to the first image's analysis
+                message = ""
+
         # Handle reset button
-        def handle_reset():
-            updated_progress = reset_calories()
-            return updated_progress
-        
+        def handle_reset(daily_state):
+            return reset_calories(daily_state)
+
         # Event handlers
         multimodal_input.submit(
             handle_multimodal_submit,
-            inputs=[multimodal_input, chatbot],
-            outputs=[multimodal_input, chatbot, progress_output]
+            inputs=[multimodal_input, chatbot, daily_state],
+            outputs=[multimodal_input, chatbot, progress_output, daily_state]
         )
-        
+
         reset_btn.click(
             handle_reset,
-            outputs=[progress_output]
+            inputs=[daily_state],
+            outputs=[progress_output, daily_state]
         )
-    
+
+        # Seed each browser session with the current day's tally and render
+        # the matching bar, so sessions opened hours after launch don't start
+        # from the build-time snapshot with a zeroed progress bar beside it
+        def init_session():
+            state = DailyState(calories=get_today_calories())
+            return state, create_progress_bar_html(state.calories, daily_goal)
+
+        demo.load(init_session, outputs=[daily_state, progress_output])
+
     return demo
 
 if __name__ == "__main__":
     # Initialize database and tables
     create_db_and_tables()
 
-    # Warm up the model to reduce first-time latency
-    warm_up_model()
+    # Warm up the models in the background so the UI binds immediately;
+    # by the time a user uploads a photo the weights are typically resident
+    threading.Thread(target=warm_up_model, daemon=True).start()
     
-    # Launch the chat interface
+    # Launch the chat interface with a bounded queue so one slow LLaVA call
+    # can't stall every other user; concurrency should match OLLAMA_NUM_PARALLEL
     demo = create_interface()
+    demo.queue(
+        default_concurrency_limit=int(os.environ.get("OLLAMA_NUM_PARALLEL", "4")),
+        max_size=int(os.environ.get("WTF_QUEUE_MAX_SIZE", "32"))
+    )
     demo.launch(share=False, server_name="127.0.0.1", server_port=7860)
@@ -1,24 +1,83 @@
-from sqlmodel import SQLModel, Session, create_engine, select
+import os
+from datetime import datetime, timezone
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session, create_engine, select, func
 from models import Food, Account
 
-# Database setup
+# Database setup. echo is off by default - stringifying every statement sits
+# on the request path; flip WTF_DB_ECHO=1 when debugging queries.
 DATABASE_URL = "sqlite:///wtf.sqlite"
-engine = create_engine(DATABASE_URL, echo=True)
+engine = create_engine(
+    DATABASE_URL,
+    echo=os.environ.get("WTF_DB_ECHO") == "1",
+    connect_args={"check_same_thread": False},
+)
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply per-connection pragmas on every connection the pool opens
+
+    synchronous and temp_store are connection-scoped (unlike journal_mode,
+    which persists in the database file), so they must be set here rather
+    than once at startup or most pooled connections would run with defaults.
+    NORMAL sync is safe under WAL and skips an fsync per commit.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
 def create_db_and_tables():
     """Create database and tables"""
     print("Creating database")
     SQLModel.metadata.create_all(engine)
+    # WAL lets readers run concurrently with writes and makes commits much
+    # cheaper than the default rollback journal; the mode is stored in the
+    # database file, so setting it once here covers every later connection
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        # create_all skips tables that already exist, indexes included, so
+        # databases created before created_at was indexed would keep full-
+        # scanning in get_today_calories. Same name SQLModel would generate.
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_food_created_at ON food (created_at)"
+        )
+
+# Monotonic write counter so callers can cache derived views of the food
+# table and rebuild them only when a row has actually been added
+_foods_version = 0
+
+def get_foods_version():
+    """Current write-version of the food table"""
+    return _foods_version
 
 def save_food(name: str, calories: int, fats: int = 0, proteins: int = 0, carbs: int = 0):
     """Save food data to the database"""
+    global _foods_version
     with Session(engine) as session:
         food = Food(name=name, calories=calories, fats=fats, proteins=proteins, carbs=carbs)
         session.add(food)
         session.commit()
         session.refresh(food)
+        _foods_version += 1
         return food
 
+def save_foods(items: list):
+    """Save several foods in one transaction (one commit instead of N)
+
+    Takes a list of keyword dicts matching Food's fields; useful when an
+    analysis returns per-item breakdowns rather than one aggregate row.
+    """
+    global _foods_version
+    with Session(engine) as session:
+        foods = [Food(**item) for item in items]
+        session.add_all(foods)
+        session.commit()
+        for food in foods:
+            session.refresh(food)
+        _foods_version += 1
+        return foods
+
 def get_all_foods():
     """Retrieve all foods from the database"""
     with Session(engine) as session:
@@ -26,6 +85,42 @@ def get_all_foods():
         foods = session.exec(statement).all()
         return foods
 
+def get_all_foods_lite():
+    """Retrieve (name, calories, proteins, carbs, fats) rows, newest first
+
+    Returns plain row tuples instead of ORM instances, skipping per-attribute
+    instrumentation for read-only consumers like prompt assembly.
+    """
+    with Session(engine) as session:
+        statement = select(
+            Food.name, Food.calories, Food.proteins, Food.carbs, Food.fats
+        ).order_by(Food.created_at.desc())
+        return session.exec(statement).all()
+
+def get_today_calories(since=None):
+    """Sum of calories logged since local midnight
+
+    since, if given, is a naive-UTC datetime floor that overrides the day
+    start when it is later - used by the manual reset button so meals saved
+    before the reset stay excluded from the tally.
+
+    created_at is stored naive-UTC, so the local day boundary is converted to
+    UTC before it reaches the WHERE clause. This matches DailyState in WTF.py,
+    which rolls the session tally at local midnight - summing from UTC
+    midnight instead would drop (or resurrect) meals for any non-UTC user.
+    """
+    midnight_local = datetime.now().astimezone().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    midnight = midnight_local.astimezone(timezone.utc).replace(tzinfo=None)
+    if since is not None and since > midnight:
+        midnight = since
+    with Session(engine) as session:
+        statement = select(func.coalesce(func.sum(Food.calories), 0)).where(
+            Food.created_at >= midnight
+        )
+        return session.exec(statement).one()
+
 def get_account():
     """Fetch the first account or return None if no accounts exist"""
     with Session(engine) as session:
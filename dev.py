@@ -7,7 +7,7 @@ Automatically restarts the app when Python files change.
 import subprocess
 import sys
 from pathlib import Path
-from watchfiles import watch
+from watchfiles import watch, PythonFilter
 
 def run_app():
     """Run the main application"""
@@ -23,8 +23,10 @@ def main():
     process = run_app()
     
     try:
-        # Watch for changes in Python files
-        for changes in watch('.', watch_filter=lambda change, path: path.endswith('.py')):
+        # Watch for changes in Python files. PythonFilter runs in watchfiles'
+        # Rust core, so events from .git/, __pycache__/ etc. never cross into
+        # Python; debounce coalesces editors that write several files per save
+        for changes in watch('.', watch_filter=PythonFilter(), debounce=400, step=50):
             print(f"\n🔄 Detected changes:")
             for change_type, file_path in changes:
                 print(f"   {change_type.name}: {file_path}")
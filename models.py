@@ -22,4 +22,4 @@ class Food(SQLModel, table=True):
     fats: int = Field(default=0)
     proteins: int = Field(default=0)
     carbs: int = Field(default=0)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)